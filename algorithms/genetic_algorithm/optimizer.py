@@ -1,7 +1,7 @@
 import numpy as np
 from typing import List, Tuple, Callable
 from problem import Problem, Placement
-from functools import partial
+from functools import partial, lru_cache
 from tqdm import tqdm
 
 """
@@ -182,8 +182,14 @@ In this part, we decode the chromosome of an individual as an placement strategy
 - We choose the EMS for an item based on Distance to the Front-Top-Right Corner (FTR) rule.
 """
 
+# Reuse the placement of the current problem so that its bins are recycled across evaluations
+# (only the last problem is kept, so previous problems and their bins can be freed)
+@lru_cache(maxsize=1)
+def get_placement(problem: Problem) -> Placement:
+    return Placement(problem)
+
 def evaluate(solution: List[float], problem: Problem) -> float:
-    placement = Placement(problem)
+    placement = get_placement(problem)
     return placement.evaluate(solution)
         
 if 11 < 3:
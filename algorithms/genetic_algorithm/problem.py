@@ -1,10 +1,16 @@
+import heapq
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from numba import njit, prange
+from itertools import islice
 from typing import List, Tuple, Callable, Optional
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
+# Axis permutation of each orientation, the orientation o rotates the item (x, y, z) into item[_PERMS[o - 1]]
+_PERMS = np.array([[0, 1, 2], [0, 2, 1], [1, 0, 2], [1, 2, 0], [2, 0, 1], [2, 1, 0]], dtype=np.intp)
+
 class Problem:
     def __init__(self, path: str):
         self.path = path
@@ -17,17 +23,17 @@ class Problem:
 
     def load_data(self):
         with open(self.path, 'r') as file:
-            lines = file.readlines()
+            lines = list(islice(file, 4))
         
         self.bin_size = tuple(map(int, lines[0].split()[2:]))
         self.n_bins = int(lines[1].strip().split()[3])
         self.n_items = int(lines[2].strip().split()[5])
         self.total_volume = int(lines[3].strip().split()[4])
-        self.items = []
-
-        for line in lines[5:]:
-            item = tuple(map(int, line.strip().split()))
-            self.items.append(item)
+        # Each row is the size (x, y, z) of an item
+        self.items = np.loadtxt(self.path, skiprows=5, dtype=np.int32, ndmin=2)
+        # oriented[o - 1, i] is the size of item i in orientation o
+        self.oriented = np.stack([self.items[:, perm] for perm in _PERMS])
+        self.item_volumes = self.items.prod(axis=1, dtype=np.int64)
 
         print(f'Loaded data from {self.path}')
         print(f'Problem: {self.n_items} items | {self.n_bins} bins | {self.bin_size} | {self.total_volume}')
@@ -94,168 +100,401 @@ class Problem:
 
         plt.show()
     
+@njit(cache=True)
+def choose_ems(lo: np.ndarray, hi: np.ndarray, created: np.ndarray, n_EMSs: int, items: np.ndarray, n_items: int, item: np.ndarray, bin_size: np.ndarray) -> int:
+    """
+    Return the index of the EMS chosen by the Distance to Front-Top-Right Corner (FTR) rule, -1 if the item fits nowhere.
+    - EMS k spans from lo[k] to hi[k], only the first n_EMSs rows are used.
+    - created[k] is the creation rank of EMS k, ties on the distance go to the oldest EMS.
+    - Placed items are boxes (x1, y1, z1, x2, y2, z2), only the first n_items rows are used.
+    - An EMS is feasible if the item fits inside it and does not overlap any placed item.
+    """
+    max_distance = -1
+    selected = -1
+    selected_created = 0
+    for k in range(n_EMSs):
+        x1, y1, z1 = lo[k, 0], lo[k, 1], lo[k, 2]
+        x2, y2, z2 = x1 + item[0], y1 + item[1], z1 + item[2]
+        dx, dy, dz = bin_size[0] - x2, bin_size[1] - y2, bin_size[2] - z2
+        distance = dx * dx + dy * dy + dz * dz
+
+        # Branchless fit test (& does not short-circuit), only the EMSs improving the current choice reach the overlap scan
+        improves = (distance > max_distance) | ((distance == max_distance) & (created[k] < selected_created))
+        if not ((x2 <= hi[k, 0]) & (y2 <= hi[k, 1]) & (z2 <= hi[k, 2]) & improves):
+            continue
+
+        overlapped = False
+        for j in range(n_items):
+            if ((x1 < items[j, 3]) & (y1 < items[j, 4]) & (z1 < items[j, 5]) &
+                    (x2 > items[j, 0]) & (y2 > items[j, 1]) & (z2 > items[j, 2])):
+                overlapped = True
+                break
+        if overlapped:
+            continue
+
+        max_distance = distance
+        selected = k
+        selected_created = created[k]
+    return selected
+
+# Compile the kernel once at import so that the first evaluation does not pay the JIT cost
+choose_ems(np.zeros((1, 3), dtype=np.int32), np.zeros((1, 3), dtype=np.int32), np.zeros(1, dtype=np.int64), 1, np.zeros((1, 6), dtype=np.int32), 0, np.zeros(3, dtype=np.int32), np.zeros(3, dtype=np.int32))
+
+@njit(cache=True)
+def decode_items(solution: np.ndarray, oriented: np.ndarray) -> np.ndarray:
+    """
+    Return the items rotated and reordered by the solution, as done by Placement.decode.
+    - oriented[o - 1, i] is the size of item i in orientation o (see Problem.oriented).
+    """
+    total_items = oriented.shape[1]
+    orders = np.argsort(solution[:total_items], kind='mergesort')
+    decoded = np.empty_like(oriented[0])
+    for i in range(total_items):
+        orientation = min(max(int(np.ceil(6 * solution[total_items + i])), 1), 6)
+        decoded[orders[i]] = oriented[orientation - 1, i]
+    return decoded
+
+@njit(cache=True)
+def _resize(array: np.ndarray, n_bins: int, n_rows: int) -> np.ndarray:
+    resized = np.empty((n_bins, n_rows, array.shape[2]), dtype=array.dtype)
+    resized[:array.shape[0], :array.shape[1]] = array
+    return resized
+
+@njit(cache=True)
+def _resize_rows(array: np.ndarray, n_bins: int, n_rows: int) -> np.ndarray:
+    resized = np.empty((n_bins, n_rows), dtype=array.dtype)
+    resized[:array.shape[0], :array.shape[1]] = array
+    return resized
+
+@njit(cache=True)
+def _open_bin(b: int, lo: np.ndarray, hi: np.ndarray, created: np.ndarray, n_EMSs: np.ndarray, n_created: np.ndarray, n_boxes: np.ndarray, loads: np.ndarray, max_free: np.ndarray, bin_size: np.ndarray) -> None:
+    lo[b, 0] = 0
+    hi[b, 0] = bin_size
+    created[b, 0] = 0
+    n_EMSs[b] = 1
+    n_created[b] = 1
+    n_boxes[b] = 0
+    loads[b] = 0
+    max_free[b] = bin_size
+
+@njit(cache=True)
+def pack_items(items: np.ndarray, bin_size: np.ndarray, best_fit: bool) -> float:
+    """
+    Pack the items in order with the same rules as Placement.evaluate and return the fitness.
+    - The used bins are tried from the tightest one with best-fit, in order of opening otherwise.
+    - All bins share (n_bins, capacity, 3) EMS arrays and a (n_bins, capacity, 6) array of placed items.
+    - The arrays are doubled along the bins or the rows whenever they are full.
+    """
+    bin_volume = np.int64(bin_size[0]) * bin_size[1] * bin_size[2]
+    lo = np.zeros((4, 16, 3), dtype=np.int32)
+    hi = np.empty((4, 16, 3), dtype=np.int32)
+    created = np.empty((4, 16), dtype=np.int64)
+    boxes = np.empty((4, 16, 6), dtype=np.int32)
+    n_EMSs = np.zeros(4, dtype=np.int64)
+    n_created = np.zeros(4, dtype=np.int64)
+    n_boxes = np.zeros(4, dtype=np.int64)
+    loads = np.zeros(4, dtype=np.int64)
+    max_free = np.empty((4, 3), dtype=np.int64)
+    _open_bin(0, lo, hi, created, n_EMSs, n_created, n_boxes, loads, max_free, bin_size)
+    used_bins = 1
+
+    for t in range(len(items)):
+        x, y, z = items[t, 0], items[t, 1], items[t, 2]
+        item_volume = np.int64(x) * y * z
+        selected_bin = -1
+        selected_EMS = -1
+
+        order = np.argsort(-loads[:used_bins], kind='mergesort') if best_fit else np.arange(used_bins)
+        for b in order:
+            if loads[b] + item_volume > bin_volume: continue # The bin is too full to contain the item
+            if x > max_free[b, 0] or y > max_free[b, 1] or z > max_free[b, 2]: continue # No EMS is long enough to contain the item
+            k = choose_ems(lo[b], hi[b], created[b], n_EMSs[b], boxes[b], n_boxes[b], items[t], bin_size)
+            if k >= 0:
+                selected_bin = b
+                selected_EMS = k
+                break
+
+        # Open a new bin if the item fits in none of the used bins
+        if selected_bin < 0:
+            if used_bins == len(loads):
+                lo = _resize(lo, 2 * used_bins, lo.shape[1])
+                hi = _resize(hi, 2 * used_bins, hi.shape[1])
+                created = _resize_rows(created, 2 * used_bins, created.shape[1])
+                boxes = _resize(boxes, 2 * used_bins, boxes.shape[1])
+                n_EMSs = np.concatenate((n_EMSs, np.zeros_like(n_EMSs)))
+                n_created = np.concatenate((n_created, np.zeros_like(n_created)))
+                n_boxes = np.concatenate((n_boxes, np.zeros_like(n_boxes)))
+                loads = np.concatenate((loads, np.zeros_like(loads)))
+                max_free = np.concatenate((max_free, np.zeros_like(max_free)))
+            _open_bin(used_bins, lo, hi, created, n_EMSs, n_created, n_boxes, loads, max_free, bin_size)
+            selected_bin = used_bins
+            selected_EMS = 0
+            used_bins += 1
+
+        # Place the item into the chosen EMS
+        b, k = selected_bin, selected_EMS
+        x1, y1, z1 = lo[b, k, 0], lo[b, k, 1], lo[b, k, 2]
+        x3, y3, z3 = hi[b, k, 0], hi[b, k, 1], hi[b, k, 2]
+        x2, y2, z2 = x1 + x, y1 + y, z1 + z
+
+        if n_boxes[b] == boxes.shape[1]:
+            boxes = _resize(boxes, boxes.shape[0], 2 * boxes.shape[1])
+        j = n_boxes[b]
+        boxes[b, j, 0], boxes[b, j, 1], boxes[b, j, 2] = x1, y1, z1
+        boxes[b, j, 3], boxes[b, j, 4], boxes[b, j, 5] = x2, y2, z2
+        n_boxes[b] += 1
+
+        last = n_EMSs[b] - 1
+        lo[b, k] = lo[b, last]
+        created[b, k] = created[b, last]
+        hi[b, k] = hi[b, last]
+        n_EMSs[b] = last
+
+        # Add the 3 new EMSs which are not degenerated and not inscribed in any existing EMS
+        for c in range(3):
+            nx, ny, nz = x1, y1, z1
+            if c == 0: nx = x2
+            elif c == 1: ny = y2
+            else: nz = z2
+            if nx >= x3 or ny >= y3 or nz >= z3: continue
+            inscribed = False
+            for e in range(last):
+                if (nx >= lo[b, e, 0] and ny >= lo[b, e, 1] and nz >= lo[b, e, 2] and
+                        x3 <= hi[b, e, 0] and y3 <= hi[b, e, 1] and z3 <= hi[b, e, 2]):
+                    inscribed = True
+                    break
+            if inscribed: continue
+            if n_EMSs[b] == lo.shape[1]:
+                lo = _resize(lo, lo.shape[0], 2 * lo.shape[1])
+                hi = _resize(hi, hi.shape[0], 2 * hi.shape[1])
+                created = _resize_rows(created, created.shape[0], 2 * created.shape[1])
+            e = n_EMSs[b]
+            lo[b, e, 0], lo[b, e, 1], lo[b, e, 2] = nx, ny, nz
+            hi[b, e, 0], hi[b, e, 1], hi[b, e, 2] = x3, y3, z3
+            created[b, e] = n_created[b]
+            n_EMSs[b] += 1
+            n_created[b] += 1
+
+        if x3 - x1 == max_free[b, 0] or y3 - y1 == max_free[b, 1] or z3 - z1 == max_free[b, 2]:
+            max_free[b] = 0
+            for e in range(n_EMSs[b]):
+                for d in range(3):
+                    max_free[b, d] = max(max_free[b, d], hi[b, e, d] - lo[b, e, d])
+
+        loads[b] += item_volume
+
+    return used_bins + loads[:used_bins].min() / bin_volume
+
+@njit(cache=True, parallel=True)
+def evaluate_population(solutions: np.ndarray, oriented: np.ndarray, bin_size: np.ndarray, best_fit: bool) -> np.ndarray:
+    """
+    Return the fitness of every solution (row) of the population, the solutions are evaluated in parallel.
+    """
+    fitnesses = np.empty(len(solutions))
+    for p in prange(len(solutions)):
+        fitnesses[p] = pack_items(decode_items(solutions[p], oriented), bin_size, best_fit)
+    return fitnesses
+
 class Placement:
     class Bin:
-        def __init__(self, size: Tuple[int]):
-            self.size = size
-            self.EMSs: List[List[Tuple[int]]] = [
-                [(0, 0, 0), size] # Each EMS is a list of 2 tuples, the first one is always like this
-            ]
-            self.items: List[List[Tuple[int]]] = []
+        def __init__(self, size: Tuple[int], capacity: int = 16):
+            self.size = np.array(size, dtype=np.int32)
+            # EMS k spans from lo[k] to hi[k], only the first n_EMSs rows are in use
+            self.lo = np.zeros((capacity, 3), dtype=np.int32)
+            self.hi = np.empty((capacity, 3), dtype=np.int32)
+            # created[k] is the creation rank of EMS k, it keeps the creation order of the EMSs despite the swap-pop removal
+            self.created = np.empty(capacity, dtype=np.int64)
+            # Each row is a placed item (x1, y1, z1, x2, y2, z2), only the first n_items rows are in use
+            self.items = np.empty((capacity, 6), dtype=np.int32)
+            self.reset()
+
+        # Empty the bin while keeping its allocated arrays
+        def reset(self) -> None:
+            self.lo[0] = 0
+            self.hi[0] = self.size
+            self.created[0] = 0
+            self.n_EMSs = 1
+            self.n_created = 1
+            self.n_items = 0
             self.load = 0
+            # Largest free extent along each axis over all EMSs, an item longer than this along some axis cannot fit
+            self.max_free = tuple(self.size.tolist())
 
-        # Return the EMS is chosen to place the item based on Distance to Front-Top-Right Corner (FTR) rule
-        def choose(self, item: Tuple[int]) -> Tuple[int]:
-            max_distance = -1
-            selected_EMS = None
-            for EMS in self.EMSs:
-                # print(f'Fit: {self.fit(item, EMS)} | Check: {self.check(item, EMS)}')
-                if self.fit(item, EMS) and self.check(item, EMS): 
-                    x, y, z = EMS[0][0] + item[0], EMS[0][1] + item[1], EMS[0][2] + item[2]
-                    distance = (self.size[0] - x) ** 2 + (self.size[1] - y) ** 2 + (self.size[2] - z) ** 2
-                    if distance > max_distance:
-                        max_distance = distance
-                        selected_EMS = EMS
-            return selected_EMS
-        
-        # Check if the item can be placed into the chosen EMS
-        def check(self, item: List[Tuple[int]], EMS: List[Tuple[int]]) -> bool:
-            x1, y1, z1 = EMS[0]
-            x2, y2, z2 = x1 + item[0], y1 + item[1], z1 + item[2]
-            space = [(x1, y1, z1), (x2, y2, z2)]
-            if not self.items: return True
-            for other_item in self.items:
-                if self.overlapped(space, other_item): return False # If the space is overlapped with other items
-            return True
-        
-        @staticmethod
-        def fit(item: Tuple[int], EMS: List[Tuple[int]]) -> bool:
-            for i in range(3):
-                if EMS[0][i] + item[i] > EMS[1][i]: return False
-            return True
-        
-        @staticmethod
-        def overlapped(item1: List[Tuple[int]], item2: List[Tuple[int]]) -> bool:
-            return np.all(np.array(item1[0]) < np.array(item2[1])) and np.all(np.array(item1[1]) > np.array(item2[0])) # EMS1 and EMS2 are overlapped
-        
-        @staticmethod
-        def inscribed(EMS1: List[Tuple[int]], EMS2: List[Tuple[int]]) -> bool:
-            return np.all(np.array(EMS1[0]) >= np.array(EMS2[0])) and np.all(np.array(EMS1[1]) <= np.array(EMS2[1])) # EMS1 is inscribed in EMS2
-
-        # Update EMSs after placing the item into the chosen EMS
-        def update(self, item: Tuple[int], selected_EMS: Tuple[int]) -> None:
-            x1, y1, z1 = selected_EMS[0]
-            x2, y2, z2 = x1 + item[0], y1 + item[1], z1 + item[2]
-            x3, y3, z3 = selected_EMS[1]
-
-            self.items.append([(x1, y1, z1), (x2, y2, z2)])
-
-            new_EMSs = [
-                [(x2, y1, z1), (x3, y3, z3)],
-                [(x1, y2, z1), (x3, y3, z3)],
-                [(x1, y1, z2), (x3, y3, z3)]
-            ]
-
-            self.EMSs.remove(selected_EMS)
-            for EMS in new_EMSs:
-                isValid = True
-                for i in range(3):
-                    if EMS[0][i] >= EMS[1][i]:
-                        isValid = False
-                        break
-
-                for other_EMS in self.EMSs:
-                    if self.inscribed(EMS, other_EMS):
-                        isValid = False
-                        break
+        # Return the index of the EMS chosen to place the item based on Distance to Front-Top-Right Corner (FTR) rule, -1 if none
+        def choose(self, item: np.ndarray) -> int:
+            return choose_ems(self.lo, self.hi, self.created, self.n_EMSs, self.items, self.n_items, item, self.size)
 
-                if isValid:
-                    self.EMSs.append(EMS)
+        # Return a mask of the spaces [lo[i], hi[i]] which are inscribed in at least one EMS
+        def inscribed(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+            n = self.n_EMSs
+            return ((lo[:, None] >= self.lo[:n]) & (hi[:, None] <= self.hi[:n])).all(axis=2).any(axis=1)
 
-            self.load += item[0] * item[1] * item[2]
+        # Double the capacity of the EMS arrays
+        def grow(self) -> None:
+            self.lo = np.concatenate((self.lo, np.zeros_like(self.lo)))
+            self.hi = np.concatenate((self.hi, np.empty_like(self.hi)))
+            self.created = np.concatenate((self.created, np.empty_like(self.created)))
 
-    def __init__(self, problem: Problem):
+        # Update EMSs after placing the item into the chosen EMS
+        def update(self, item: np.ndarray, index: int) -> None:
+            x1, y1, z1 = self.lo[index].tolist()
+            x2, y2, z2 = x1 + item[0], y1 + item[1], z1 + item[2]
+            x3, y3, z3 = self.hi[index].tolist()
+
+            if self.n_items == len(self.items):
+                self.items = np.concatenate((self.items, np.empty_like(self.items)))
+            self.items[self.n_items] = (x1, y1, z1, x2, y2, z2)
+            self.n_items += 1
+
+            new_lo = np.array([(x2, y1, z1), (x1, y2, z1), (x1, y1, z2)], dtype=np.int32)
+            new_hi = np.array([(x3, y3, z3)] * 3, dtype=np.int32)
+
+            # Remove the chosen EMS by moving the last EMS into its slot
+            last = self.n_EMSs - 1
+            self.lo[index] = self.lo[last]
+            self.hi[index] = self.hi[last]
+            self.created[index] = self.created[last]
+            self.n_EMSs = last
+
+            # Keep the new EMSs which are not degenerated and not inscribed in any existing EMS
+            # (the new EMSs cannot be inscribed in each other since the item has positive sizes)
+            # No existing EMS can be inscribed in a new one either (by induction): a new EMS lies in the removed EMS it was cut from,
+            # with its lo >= the lo of the removed EMS, and no remaining EMS was inscribed in the removed EMS before this update
+            valid = (new_lo < new_hi).all(axis=1) & ~self.inscribed(new_lo, new_hi)
+            new_lo, new_hi = new_lo[valid], new_hi[valid]
+
+            n, m = self.n_EMSs, len(new_lo)
+            while n + m > len(self.lo):
+                self.grow()
+            self.lo[n:n + m] = new_lo
+            self.hi[n:n + m] = new_hi
+            self.created[n:n + m] = np.arange(self.n_created, self.n_created + m)
+            self.n_EMSs += m
+            self.n_created += m
+
+            # The new EMSs are inside the removed one, so the largest extents can only shrink if it was the largest
+            if x3 - x1 == self.max_free[0] or y3 - y1 == self.max_free[1] or z3 - z1 == self.max_free[2]:
+                self.max_free = tuple((self.hi[:self.n_EMSs] - self.lo[:self.n_EMSs]).max(axis=0, initial=0).tolist())
+
+            self.load += int(item[0]) * int(item[1]) * int(item[2])
+
+    def __init__(self, problem: Problem, best_fit: bool = False):
         self.problem = problem
+        self.best_fit = best_fit
         self.bin_size = problem.bin_size
         self.n_bins = problem.n_bins
         self.n_items = problem.n_items
         self.total_volume = problem.total_volume
-        self.items = problem.items
+        # Decoded items and their volumes, the items of the problem are left untouched
+        self.items = np.empty_like(problem.items)
+        self.item_volumes = np.empty_like(problem.item_volumes)
+        self.indices = np.arange(len(problem.items))
 
         self.used_bins = 1
         self.total_items = self.n_items * self.n_bins
-        self.bins = [self.Bin(self.bin_size)]
-        self.loads = None
-
-    @staticmethod
-    def get_orientation(gene: float) -> int:
-        return int(np.ceil(6 * gene))
-    
-    @staticmethod
-    def get_size(item: Tuple[int], orientation: int) -> Tuple[int]:
-        x, y, z = item
-        if   orientation == 1: return (x, y, z)
-        elif orientation == 2: return (x, z, y)
-        elif orientation == 3: return (y, x, z)
-        elif orientation == 4: return (y, z, x)
-        elif orientation == 5: return (z, x, y)
-        elif orientation == 6: return (z, y, x)
+        self.bins = [self.Bin(self.bin_size)] # Pool of bins kept across evaluations, only the first used_bins are in use
+        self.bin_volume = self.bin_size[0] * self.bin_size[1] * self.bin_size[2]
+        self.bin_dims = np.array(self.bin_size, dtype=np.int32)
+
+    # Loads of the used bins, only built on demand since the fitness needs the least load only
+    @property
+    def loads(self) -> List[int]:
+        return [bin.load for bin in self.bins[:self.used_bins]]
+
+    # Empty the placement so that it can evaluate another solution without allocating new bins
+    def reset(self) -> None:
+        self.bins[0].reset()
+        self.used_bins = 1
+        # Heap of (key, bin index) of the used bins, the key is the remaining volume with best-fit (the tightest bin is tried first)
+        # and 0 otherwise (first-fit, the bins are tried in order of opening)
+        self.bins_by_remaining = [(self.bin_volume if self.best_fit else 0, 0)]
 
     def decode(self, solution) -> None:
         if len(solution) != 2 * self.total_items:
             raise ValueError('Invalid solution length')
         
-        orders = np.argsort(solution[:self.total_items])
+        solution = np.asarray(solution)
+        orders = np.argsort(solution[:self.total_items], kind='mergesort')
+        orientations = np.clip(np.ceil(6 * solution[self.total_items:]).astype(np.int8), 1, 6)
 
-        copy = self.items.copy()
-
-        for i in range(self.total_items):
-            item = copy[i]
-            orientation = self.get_orientation(solution[self.total_items + i])
-            size = self.get_size(item, orientation)
-            # print(f'Item: {item} | Orientation: {orientation} | Size: {size} | Order: {orders[i]}')
-            self.items[orders[i]] = size
+        # Pick the precomputed rotation of every item, then place item i at position orders[i]
+        self.items[orders] = self.problem.oriented[orientations - 1, self.indices]
+        self.item_volumes[orders] = self.problem.item_volumes
 
     def evaluate(self, solution: List[float]) -> float:
+        self.reset()
         self.decode(solution)
         
-        for item in self.items:
+        for item, item_volume in zip(self.items, self.item_volumes.tolist()):
             selected_bin = None
-            selected_EMS = None
-
-            for bin in self.bins:
-                # print(f'Bin index: {self.bins.index(bin)}')
+            selected_EMS = -1
+            x, y, z = item.tolist()
+
+            skipped = []
+            while self.bins_by_remaining:
+                entry = heapq.heappop(self.bins_by_remaining)
+                bin = self.bins[entry[1]]
+                if bin.load + item_volume > self.bin_volume or x > bin.max_free[0] or y > bin.max_free[1] or z > bin.max_free[2]:
+                    skipped.append(entry) # The bin is too full or no EMS is long enough to contain the item
+                    continue
+                # print(f'Bin index: {entry[1]}')
                 EMS = bin.choose(item)
                 # print(f'Item: {item} | Selected EMS: {EMS}')
-                if EMS is not None:
+                if EMS >= 0:
+                    selected_index = entry[1]
                     selected_bin = bin
                     selected_EMS = EMS
                     break
+                skipped.append(entry)
+
+            for entry in skipped:
+                heapq.heappush(self.bins_by_remaining, entry)
 
             if selected_bin is None:
+                if self.used_bins == len(self.bins):
+                    self.bins.append(self.Bin(self.bin_size))
+                selected_index = self.used_bins
+                selected_bin = self.bins[selected_index]
+                selected_bin.reset()
+                selected_EMS = 0
                 self.used_bins += 1
-                self.bins.append(self.Bin(self.bin_size))
-                selected_bin = self.bins[-1]
-                selected_EMS = selected_bin.EMSs[0]
 
             # print(f'Item: {item} | Selected EMS: {selected_EMS} | Bin index: {self.bins.index(selected_bin)}')
             selected_bin.update(item, selected_EMS)
+            heapq.heappush(self.bins_by_remaining, (self.bin_volume - selected_bin.load if self.best_fit else 0, selected_index))
             if 11 < 3:
                 print(f'Updated load: {selected_bin.load}')
-                print(f'Updated EMSs: {selected_bin.EMSs}')
-                print(f'Item: {item} | EMSs: {selected_bin.EMSs} | Bin index: {self.bins.index(selected_bin)}')
+                print(f'Updated EMSs: {selected_bin.lo[:selected_bin.n_EMSs]} | {selected_bin.hi[:selected_bin.n_EMSs]}')
+                print(f'Item: {item} | Number of EMSs: {selected_bin.n_EMSs} | Bin index: {self.bins.index(selected_bin)}')
 
-        self.loads = [bin.load for bin in self.bins]
-        least_load = np.min(self.loads) / (self.bin_size[0] * self.bin_size[1] * self.bin_size[2])
+        least_load = min(bin.load for bin in self.bins[:self.used_bins]) / self.bin_volume
         fitness = self.used_bins + least_load
 
         if fitness < self.problem.best_fitness:
             self.problem.used_bins = self.used_bins
             self.problem.best_fitness = fitness
             self.problem.loads = self.loads
-            self.problem.solution = [bin.items for bin in self.bins]
+            self.problem.solution = [bin.items[:bin.n_items].reshape(-1, 2, 3).copy() for bin in self.bins[:self.used_bins]]
 
         return fitness # To maximize the fitness
+
+    def evaluate_population(self, solutions: np.ndarray) -> np.ndarray:
+        """
+        Return the fitness of every solution (row) of the population, the solutions are packed in parallel.
+        - Only the best solution is packed again by evaluate to record its placement in the problem.
+        """
+        # A C-contiguous float64 matrix always hits the same compiled (and cached) specialization of the kernel
+        solutions = np.ascontiguousarray(solutions, dtype=np.float64)
+        if solutions.ndim != 2 or solutions.shape[1] != 2 * self.total_items:
+            raise ValueError('Invalid solution length')
+
+        fitnesses = evaluate_population(solutions, self.problem.oriented, self.bin_dims, bool(self.best_fit))
+
+        best = np.argmin(fitnesses)
+        if fitnesses[best] < self.problem.best_fitness:
+            self.evaluate(solutions[best])
+
+        return fitnesses
     
 if 11 < 3:
     problem = Problem('Data/Dataset/test.dat')
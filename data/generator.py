@@ -1,10 +1,8 @@
 import os
-import random
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 
 from typing import List, Tuple
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from concurrent.futures import ProcessPoolExecutor
 
 class Generator:
     def __init__(self, n_items: int, n_bins: int = 1, seed: int = 0, bin_size: List[int] = [100, 100, 100], **kwargs):
@@ -23,6 +21,7 @@ class Generator:
         self.n_items: int = n_items
         self.n_bins: int = n_bins
         self.seed: int = seed
+        self.rng: np.random.Generator = np.random.default_rng(seed)
         self.bin_size: List[int] = bin_size
         self.items: List[List[Tuple[List[int], List[int]]]] = []
         self.flat_items: List[Tuple[List[int], List[int]]] = None
@@ -51,52 +50,45 @@ class Generator:
             - We will generate items by recursively splitting the bin into 2 parts along the largest dimension.
             - We also keep track of the origin of each item (coordinates of the left-bottom-back corner) for visualization.
             """
-            items = [(bin_origin, self.bin_size[:])]
-            bin_volume = self.bin_size[0] * self.bin_size[1] * self.bin_size[2]
-
-            for _ in range(self.n_items + self.n_samples - 1):
-                (origin, item) = items.pop()
-                
-                # Choose the dimension with the largest size to split
-                dimension: int = item.index(max(item))
-                size: int = item[dimension]
+            # Each row is a cuboid (origin and size), only the first k rows are in use
+            n_cuboids = self.n_items + self.n_samples
+            origins = np.zeros((n_cuboids, 3), dtype=np.int32)
+            sizes = np.empty((n_cuboids, 3), dtype=np.int32)
+            origins[0] = bin_origin
+            sizes[0] = self.bin_size
+            k = 1
+
+            while k < n_cuboids:
+                # Choose the cuboid with the largest volume and its largest dimension to split
+                i = np.argmax(sizes[:k].prod(axis=1))
+                dimension = sizes[i].argmax()
+                size = sizes[i, dimension]
                 
                 if size == 1:
-                    items.append((origin, item))
-                    continue
+                    break # All cuboids are unit cubes
                 
                 # Randomly choose a cut point
-                cut_point: int = random.randint(1, size - 1)
-                
-                # Create 2 new items after cutting
-                new_item1: List[int] = item[:]
-                new_item2: List[int] = item[:]
-                new_item1[dimension] = cut_point
-                new_item2[dimension] = size - cut_point
+                cut_point = self.rng.integers(1, size)
                 
-                # Create 2 new origins (coordinates of the left-bottom-back corner)
-                new_origin1: List[int] = origin[:]
-                new_origin2: List[int] = origin[:]
-                new_origin2[dimension] += cut_point
-                
-                # Add new items to the list
-                items.append((new_origin1, new_item1))
-                items.append((new_origin2, new_item2))
-                items.sort(key=lambda x: x[1][0] * x[1][1] * x[1][2])
+                # The new cuboid is the part beyond the cut point, the chosen cuboid keeps the part before it
+                sizes[k] = sizes[i]
+                origins[k] = origins[i]
+                sizes[k, dimension] = size - cut_point
+                origins[k, dimension] += cut_point
+                sizes[i, dimension] = cut_point
+                k += 1
 
             # Sort items by height to remove some topmost items
-            items.sort(key=lambda x: x[0][2])
-            for _ in range(self.n_samples):
-                item = items.pop()
-                bin_volume -= item[1][0] * item[1][1] * item[1][2]
-
-            self.total_volume += bin_volume
-            return items
+            # (all of them if the splitting stopped early on unit cubes with fewer than n_samples cuboids)
+            kept = np.argsort(origins[:k, 2], kind='stable')[:max(k - self.n_samples, 0)]
+            self.total_volume += int(sizes[kept].prod(axis=1).sum())
+            return [(origins[i].tolist(), sizes[i].tolist()) for i in kept]
 
         if self.n_items < 10 or self.n_items > 1000:
             raise ValueError('Number of items must be between 10 and 1000')
         
-        random.seed(self.seed)
+        # Re-seed so that every call generates the same data
+        self.rng = np.random.default_rng(self.seed)
 
         self.items = []
         self.total_volume = 0
@@ -108,26 +100,34 @@ class Generator:
         
         # Flatten the list of items and reorder randomly
         self.flat_items = [item for bin_items in self.items for item in bin_items]
-        random.shuffle(self.flat_items)
+        self.rng.shuffle(self.flat_items)
         
         # Ensure the directory exists
         os.makedirs(os.path.dirname(f'Data/Dataset/'), exist_ok=True)
 
+        # Randomly permute the dimensions of each item
+        sizes = self.rng.permuted(np.array([item for (_, item) in self.flat_items], dtype=np.int32).reshape(-1, 3), axis=1)
+
         # Write data to file
         with open(self.filename, 'w') as file:
-            file.write(f'Bin size: {self.bin_size[0]} {self.bin_size[1]} {self.bin_size[2]}\n')
-            file.write(f'Number of bins: {self.n_bins}\n')
-            file.write(f'Number of items per bin: {self.n_items}\n')
-            file.write(f'Total volume of items: {self.total_volume}\n')
-            file.write('Items:\n')
-            for (_, item) in self.flat_items:
-                sample = random.sample(item, 3)
-                file.write(f'{sample[0]} {sample[1]} {sample[2]}\n')
+            file.write(
+                f'Bin size: {self.bin_size[0]} {self.bin_size[1]} {self.bin_size[2]}\n'
+                f'Number of bins: {self.n_bins}\n'
+                f'Number of items per bin: {self.n_items}\n'
+                f'Total volume of items: {self.total_volume}\n'
+                'Items:\n'
+            )
+            np.savetxt(file, sizes, fmt='%d')
     
     def visualize(self) -> None:
         """
         Visualize the generated items in a 3D plot.
         """
+        # Plotting libraries are imported here so that generating data does not pay their import cost
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
         def plot_box(ax, x0: int, y0: int, z0: int, dx: int, dy: int, dz: int, color) -> None:
             vertices = [
                 [x0, y0, z0], [x0 + dx, y0, z0], [x0 + dx, y0 + dy, z0], [x0, y0 + dy, z0],
@@ -189,12 +189,15 @@ class Generator:
         """
         os.remove(self.filename)
 
-# Example of using the Generator class
-if 11 < 3:
-    for i in range(100):
-        generator = Generator(50, 5, seed=i, bin_size=[100, 100, 100])
-        generator.generate()
-        generator.delete()
+def _generate_one(seed: int) -> None:
+    generator = Generator(50, 5, seed=seed, bin_size=[100, 100, 100])
+    generator.generate()
+    generator.delete()
+
+# Example of using the Generator class, the instances are independent (one seed each) so they are generated in parallel
+if __name__ == '__main__' and 11 < 3:
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_generate_one, range(100)))
 
 if 11 < 3:
     generator = Generator(20, 1, seed=1, bin_size=[10, 10, 10], n_samples=10)